@@ -0,0 +1,62 @@
+"""One-off migration: convert ISO-string created_at fields to BSON dates.
+
+Older versions of the API stored created_at (on prescriptions, their embedded
+medications, and manually added medications) as isoformat() strings. The API
+now stores and sorts on native dates, so string values would sort apart from
+new documents and fail range queries. Run once against each database:
+
+    python migrate_created_at.py
+
+The conversion runs server-side as pipeline updates, so documents are not
+pulled into Python. Already-converted documents are skipped, making the script
+safe to re-run.
+"""
+from pathlib import Path
+import os
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+TO_DATE = {"$dateFromString": {"dateString": "$created_at"}}
+
+def migrate(db) -> None:
+    result = db.medications.update_many(
+        {"created_at": {"$type": "string"}},
+        [{"$set": {"created_at": TO_DATE}}]
+    )
+    print(f"medications: {result.modified_count} converted")
+
+    result = db.prescriptions.update_many(
+        {"$or": [
+            {"created_at": {"$type": "string"}},
+            {"medications.created_at": {"$type": "string"}},
+        ]},
+        [{"$set": {
+            "created_at": {"$cond": [
+                {"$eq": [{"$type": "$created_at"}, "string"]}, TO_DATE, "$created_at"
+            ]},
+            "medications": {"$map": {
+                "input": {"$ifNull": ["$medications", []]},
+                "as": "med",
+                "in": {"$cond": [
+                    {"$eq": [{"$type": "$$med.created_at"}, "string"]},
+                    {"$mergeObjects": [
+                        "$$med",
+                        {"created_at": {"$dateFromString": {"dateString": "$$med.created_at"}}}
+                    ]},
+                    "$$med"
+                ]}
+            }},
+        }}]
+    )
+    print(f"prescriptions: {result.modified_count} converted")
+
+if __name__ == "__main__":
+    client = MongoClient(os.environ['MONGO_URL'])
+    try:
+        migrate(client[os.environ['DB_NAME']])
+    finally:
+        client.close()
@@ -1,35 +1,80 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Query, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
+from gridfs import AsyncGridFSBucket, NoFile
 import os
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError
 from typing import List, Optional
+from typing_extensions import TypedDict
 import uuid
 from datetime import datetime, timezone
-import base64
-import json
+import pybase64
+import binascii
+import hashlib
+from io import BytesIO
+import re
+import orjson
+import asyncio
+import random
+from functools import lru_cache, partial
+from cachetools import TTLCache
+
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
 
 # Google Generative AI imports
 import google.generativeai as genai
+from google.generativeai import client as genai_client
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Request handlers only format and enqueue log records; a listener thread
+# writes them to stderr, so a slow stream never blocks the event loop
+log_queue = queue.SimpleQueue()
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[QueueHandler(log_queue)]
+)
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logger = logging.getLogger(__name__)
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Pool sizing is explicit so bursts of uploads don't queue behind the driver
+# defaults. The client does its I/O on the event loop itself, with no thread
+# pool in between.
+client = AsyncMongoClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000')),
+    # created_at is stored as a BSON date; read it back as an aware UTC
+    # datetime, which the streamed responses write with OPT_UTC_Z so it reads
+    # "...Z" just as pydantic writes it in the upload responses
+    tz_aware=True,
+    tzinfo=timezone.utc
+)
 db = client[os.environ['DB_NAME']]
+# Uploaded images, keyed by their sha256 digest (Prescription.image_data)
+prescription_images = AsyncGridFSBucket(db, bucket_name="prescription_images")
 
-app = FastAPI(title="PillGuide API", version="2.0")
+app = FastAPI(title="PillGuide API", version="2.0", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Configure Google Generative AI with your API key
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
 if not GEMINI_API_KEY:
-    logging.warning("GEMINI_API_KEY not found. Set it in .env file")
+    logger.warning("GEMINI_API_KEY not found. Set it in .env file")
 genai.configure(api_key=GEMINI_API_KEY)
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
 
 SUPPORTED_LANGUAGES = {
     "en": "English",
@@ -44,15 +89,83 @@ SUPPORTED_LANGUAGES = {
     "ja": "Japanese"
 }
 
+# Upload size limits: decoded image bytes, the equivalent base64 length, and the
+# whole request body (image plus a little room for the other JSON fields)
+MAX_IMAGE_BYTES = 8 * 1024 * 1024
+MAX_IMAGE_BASE64_LENGTH = 4 * -(-MAX_IMAGE_BYTES // 3)
+MAX_REQUEST_BYTES = MAX_IMAGE_BASE64_LENGTH + 64 * 1024
+
+# Longest edge sent to Gemini Vision; larger photos are downscaled before upload
+MAX_IMAGE_DIMENSION = 1568
+# Pillow formats Gemini Vision accepts as-is; anything else is re-encoded to JPEG
+GEMINI_IMAGE_FORMATS = ('PNG', 'JPEG', 'WEBP')
+
+# How long analyzed prescription images are remembered by content hash
+IMAGE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# Fields left out of prescription listings unless full documents are requested
+PRESCRIPTION_LIST_PROJECTION = {"_id": 0, "image_data": 0, "extracted_text": 0}
+
+# Upper bound on concurrent per-medication explanation calls (the fallback when
+# a batched explanation fails), shared by all requests in the process
+EXPLANATION_CONCURRENCY = asyncio.Semaphore(int(os.environ.get('EXPLANATION_MAX_CONCURRENCY', '8')))
+
+# Writes made after responding are retried on connection failures, doubling
+# the delay each time
+MONGO_WRITE_ATTEMPTS = 3
+MONGO_WRITE_RETRY_DELAY = 0.2
+DUPLICATE_KEY_ERROR = 11000
+
+# Stored prescriptions are queued and written in batches, so bursts of uploads
+# share insert_many round trips instead of one insert each
+PRESCRIPTION_BATCH_SIZE = 100
+PRESCRIPTION_BATCH_DELAY = 0.2
+PRESCRIPTION_FLUSH_TIMEOUT = 10
+
+# Largest list accepted by POST /medications/bulk
+MAX_BULK_MEDICATIONS = 50
+
+# Upper bound on concurrent pairwise interaction checks within one request,
+# so a long medication list does not take every LLM_CONCURRENCY slot
+INTERACTION_FANOUT = 5
+
+# Process-wide cap on in-flight Gemini calls; bursts queue here instead of
+# coming back from the API as rate-limit errors
+LLM_CONCURRENCY = asyncio.Semaphore(int(os.environ.get('LLM_MAX_CONCURRENCY', '16')))
+
+# Rate-limited or overloaded Gemini calls are retried with exponential backoff
+LLM_RETRY_ATTEMPTS = 5
+LLM_RETRY_BASE_DELAY = 0.5
+LLM_RETRY_MAX_DELAY = 8
+LLM_RETRYABLE_ERRORS = (ResourceExhausted, ServiceUnavailable)
+
+# Explanations and interaction checks depend only on their inputs, so repeated
+# requests for common medications are served from memory instead of Gemini
+EXPLANATION_CACHE = TTLCache(maxsize=10_000, ttl=86400)
+INTERACTION_CACHE = TTLCache(maxsize=10_000, ttl=86400)
+
+# Interaction checks (llm_cache) and medication explanations
+# (medication_explanations) are also kept in Mongo, shared between workers and
+# restarts, until their TTL indexes expire them
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
 class PrescriptionCreate(BaseModel):
     image_base64: str
     patient_id: Optional[str] = None
     preferred_language: str = "en"
 
-class Medication(BaseModel):
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+# A partial rather than a def, so each call skips a Python frame
+utc_now = partial(datetime.now, timezone.utc)
+
+class StoredDocument(BaseModel):
+    """Base for models stored in MongoDB; unknown fields from older documents are dropped"""
     model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+
+class Medication(StoredDocument):
+    id: str = Field(default_factory=new_id)
     name: str
     dosage: str
     frequency: str
@@ -64,20 +177,21 @@ class Medication(BaseModel):
     warnings: List[str] = []
     original_language: Optional[str] = None
     translated_to: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
 
-class Prescription(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+class Prescription(StoredDocument):
+    id: str = Field(default_factory=new_id)
     patient_id: Optional[str] = None
-    image_data: str
-    extracted_text: str
+    image_data: Optional[str] = None
+    extracted_text: Optional[str] = None
     detected_language: str
     preferred_language: str
     medications: List[Medication]
     analysis_complete: bool = False
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
+
+# Dumps a whole list of medications in one pydantic-core call
+MEDICATION_LIST = TypeAdapter(List[Medication])
 
 class MedicationCreate(BaseModel):
     name: str
@@ -101,14 +215,260 @@ class ContraindictionResult(BaseModel):
 class LanguageList(BaseModel):
     languages: dict
 
+# Parsed Gemini Vision replies. Defaults cover fields the model leaves out;
+# explanation fields are empty when the analysis did not provide one.
+class ExtractedMedication(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    name: str = ""
+    name_english: str = ""
+    dosage: str = "As prescribed"
+    frequency: str = "As prescribed"
+    timing: List[str] = []
+    duration: Optional[str] = None
+    with_food: bool = False
+    plain_explanation: str = ""
+    why_timing_matters: str = ""
+    dosage_safety_reminder: str = ""
+    
+    @property
+    def display_name(self) -> str:
+        return self.name_english or self.name
+
+class PrescriptionAnalysis(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    detected_language: str = "unknown"
+    detected_language_name: str = "Unknown"
+    extracted_text: str = "No text extracted"
+    medications: List[ExtractedMedication] = []
+
+# Response schemas passed to Gemini so replies are constrained to these shapes
+class ExtractedMedicationSchema(TypedDict):
+    name: str
+    name_english: str
+    dosage: str
+    frequency: str
+    timing: List[str]
+    duration: str
+    with_food: bool
+    plain_explanation: str
+    why_timing_matters: str
+    dosage_safety_reminder: str
+
+class PrescriptionAnalysisSchema(TypedDict):
+    detected_language: str
+    detected_language_name: str
+    extracted_text: str
+    medications: List[ExtractedMedicationSchema]
+
+class MedicationExplanationSchema(TypedDict):
+    plain_explanation: str
+    why_timing_matters: str
+    dosage_safety_reminder: str
+
+class IndexedMedicationExplanationSchema(MedicationExplanationSchema):
+    index: int
+
+class MedicationExplanationBatchSchema(TypedDict):
+    explanations: List[IndexedMedicationExplanationSchema]
+
+class ContraindicationSchema(TypedDict):
+    has_contraindications: bool
+    warnings: List[str]
+    recommendations: str
+
+# Output token caps per call type. Explanations and interaction checks are short;
+# the analysis (which carries the explanations) and batched explanations scale
+# with the number of medications.
+ANALYSIS_MAX_OUTPUT_TOKENS = 4096
+BATCH_EXPLANATION_MAX_OUTPUT_TOKENS = 2048
+EXPLANATION_MAX_OUTPUT_TOKENS = 512
+CONTRAINDICATION_MAX_OUTPUT_TOKENS = 512
+
+# Static system instructions. These are sent as the model's system_instruction so
+# the invariant part of every prompt is identical across requests and only the
+# per-request details travel in the user turn. Replies are constrained to JSON by
+# the response schema, so the templates only describe what each field holds.
+def prescription_analysis_instruction(language_name: str) -> str:
+    """System instruction for reading a prescription image and explaining each
+    medication in the given language"""
+    return f"""Analyze prescription images. They may be in ANY language.
+
+- detected_language: language code (en/es/hi/ar/zh/fr/de/pt/ru/ja); detected_language_name: its name
+- extracted_text: full original text from the prescription
+- For each medication: name as written, name_english, dosage, frequency, timing (e.g. morning, evening), duration if specified, with_food
+- Also for each medication, in {language_name}: plain_explanation (what it does, 2-3 sentences), why_timing_matters (Nudge Theory), dosage_safety_reminder
+
+Keep each explanation field under 80 words.
+
+If unclear, use detected_language "unknown", extracted_text "Unable to read" and no medications."""
+
+# User-turn templates; only these vary per request
+PRESCRIPTION_ANALYSIS_PROMPT = "Analyze this prescription image."
+EXPLANATION_PROMPT = "Medication '{name}' (dosage: '{dosage}', frequency: {frequency})"
+CONTRAINDICATION_PROMPT = "Check if '{name}' has contraindications with: {other}."
+
+# Picks the detected language and the start of the medication list out of a
+# partially streamed analysis reply
+DETECTED_LANGUAGE_PATTERN = re.compile(r'"detected_language"\s*:\s*"([^"]*)"')
+MEDICATIONS_ARRAY_PATTERN = re.compile(r'"medications"\s*:\s*\[')
+
+def explanation_instruction(language_name: str) -> str:
+    """System instruction for plain language explanations in the given language"""
+    return f"""For the given medication, provide in {language_name}:
+- plain_explanation: what it does, 2-3 sentences
+- why_timing_matters: why timing matters (Nudge Theory)
+- dosage_safety_reminder: a dosage safety reminder
+
+Keep each field under 80 words."""
+
+def batch_explanation_instruction(language_name: str) -> str:
+    """System instruction for explaining a JSON array of medications in one call"""
+    return f"""For each medication in the given JSON array, provide in {language_name}:
+- plain_explanation: what it does, 2-3 sentences
+- why_timing_matters: why timing matters (Nudge Theory)
+- dosage_safety_reminder: a dosage safety reminder
+
+Keep each field under 80 words.
+
+Return one entry per medication, in the same order, copying each medication's "index"."""
+
+def contraindication_instruction(language_name: str) -> str:
+    """System instruction for drug interaction checks in the given language"""
+    return f"""Check the given medication for contraindications with the listed current medication.
+
+Provide in {language_name}: has_contraindications, warnings (one sentence each) and recommendations (under 80 words)."""
+
+# Per-language system instructions, built once; unsupported codes use English
+PRESCRIPTION_ANALYSIS_INSTRUCTIONS = {
+    code: prescription_analysis_instruction(name) for code, name in SUPPORTED_LANGUAGES.items()
+}
+EXPLANATION_INSTRUCTIONS = {
+    code: explanation_instruction(name) for code, name in SUPPORTED_LANGUAGES.items()
+}
+BATCH_EXPLANATION_INSTRUCTIONS = {
+    code: batch_explanation_instruction(name) for code, name in SUPPORTED_LANGUAGES.items()
+}
+CONTRAINDICATION_INSTRUCTIONS = {
+    code: contraindication_instruction(name) for code, name in SUPPORTED_LANGUAGES.items()
+}
+
+@lru_cache(maxsize=64)
+def create_gemini_model(
+    system_instruction: str,
+    max_output_tokens: int,
+    response_schema: type
+) -> genai.GenerativeModel:
+    """Create a Gemini model bound to a static system instruction.
+
+    Instances are memoized per instruction; the set of instructions is closed
+    (one analyzer prompt plus one per supported language and purpose).
+    """
+    return genai.GenerativeModel(
+        GEMINI_MODEL,
+        system_instruction=system_instruction,
+        generation_config={
+            'response_mime_type': 'application/json',
+            'response_schema': response_schema,
+            'max_output_tokens': max_output_tokens
+        }
+    )
+
+def requested_retry_delay(error: Exception) -> Optional[float]:
+    """The delay Gemini asked for in a RetryInfo error detail, if any"""
+    for detail in getattr(error, 'details', None) or []:
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    return None
+
+async def backoff_or_raise(attempt: int, error: Exception) -> None:
+    """Sleep before retry number attempt + 1, or re-raise once attempts run out.
+
+    Waits as long as Gemini asked for when it says, giving up at once if that
+    is longer than LLM_RETRY_MAX_DELAY since an earlier retry would only be
+    throttled again. Otherwise waits a random delay up to the exponential
+    backoff, capped at LLM_RETRY_MAX_DELAY, so calls throttled together don't
+    all retry together.
+    """
+    if attempt + 1 >= LLM_RETRY_ATTEMPTS:
+        raise error
+    delay = requested_retry_delay(error)
+    if delay is None:
+        delay = min(random.uniform(0, LLM_RETRY_BASE_DELAY * 2 ** attempt), LLM_RETRY_MAX_DELAY)
+    elif delay > LLM_RETRY_MAX_DELAY:
+        raise error
+    logger.warning("Gemini call throttled (attempt %d of %d), retrying in %.1fs: %s", attempt + 1, LLM_RETRY_ATTEMPTS, delay, error)
+    await asyncio.sleep(delay)
+
+async def generate_content(model: genai.GenerativeModel, contents):
+    """Call Gemini under the process-wide concurrency limit, retrying on rate limits"""
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        try:
+            async with LLM_CONCURRENCY:
+                return await model.generate_content_async(contents)
+        except LLM_RETRYABLE_ERRORS as e:
+            await backoff_or_raise(attempt, e)
+
+async def stream_content(model: genai.GenerativeModel, contents):
+    """Stream reply text from Gemini under the concurrency limit.
+
+    Retries only before the first chunk arrives, so no text is ever repeated.
+    """
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        started = False
+        try:
+            async with LLM_CONCURRENCY:
+                response = await model.generate_content_async(contents, stream=True)
+                async for chunk in response:
+                    started = True
+                    yield chunk.text
+            return
+        except LLM_RETRYABLE_ERRORS as e:
+            if started:
+                raise
+            await backoff_or_raise(attempt, e)
+
+# Contents of the first markdown code fence, with or without a json tag
+JSON_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|$)', re.DOTALL)
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing brace or bracket, which JSON
+    forbids, leaving string contents untouched"""
+    kept = []
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ',':
+            following = i + 1
+            while following < len(text) and text[following].isspace():
+                following += 1
+            if text[following:following + 1] in ('}', ']'):
+                continue
+        kept.append(char)
+    return ''.join(kept)
+
 def extract_json_from_response(text: str) -> dict:
     """Extract and parse JSON from AI response"""
-    text = text.strip()
+    # JSON mode replies are bare JSON; only fall back to stripping markdown and
+    # surrounding prose when that fails
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
     
-    if '```json' in text:
-        text = text.split('```json')[1].split('```')[0].strip()
-    elif '```' in text:
-        text = text.split('```')[1].split('```')[0].strip()
+    fenced = JSON_FENCE_PATTERN.search(text)
+    text = fenced.group(1) if fenced else text.strip()
     
     if not text.startswith('{'):
         start = text.find('{')
@@ -121,61 +481,349 @@ def extract_json_from_response(text: str) -> dict:
     if not text:
         raise ValueError("Empty response after JSON extraction")
     
-    return json.loads(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # Second chance for the trailing commas models sometimes emit
+        repaired = strip_trailing_commas(text)
+        if repaired == text:
+            raise
+        return orjson.loads(repaired)
+
+def ensure_image_size(image_base64: str) -> None:
+    """Fail fast on images that would exceed MAX_IMAGE_BYTES once decoded"""
+    if len(image_base64) > MAX_IMAGE_BASE64_LENGTH:
+        raise HTTPException(status_code=413, detail="Prescription image is too large")
+
+def decode_prescription_image(image_base64: str) -> tuple:
+    """Decode an uploaded image and compute its SHA-256 content hash.
+
+    Decoding is strict: without validate=True, characters outside the base64
+    alphabet are silently dropped and a mangled upload would still be sent to
+    Gemini as garbage bytes.
+    """
+    image_bytes = pybase64.b64decode(image_base64, validate=True)
+    return image_bytes, hashlib.sha256(image_bytes).hexdigest()
 
-async def analyze_prescription_image(image_base64: str, preferred_language: str) -> dict:
-    """Analyze prescription image using Gemini Vision"""
+def prepare_prescription_image(image_bytes: bytes) -> dict:
+    """Build the Gemini image part, re-encoding oversized, rotated or
+    unsupported-format images to JPEG"""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Decode base64 to bytes
-        image_bytes = base64.b64decode(image_base64)
-        
-        # Create image part for Gemini
-        image_part = {
-            'mime_type': 'image/png',
-            'data': image_bytes
-        }
-        
-        prompt = """Analyze this prescription image. It may be in ANY language.
-
-Return ONLY valid JSON (no markdown):
-{
-    "detected_language": "language code (en/es/hi/ar/zh/fr/de/pt/ru/ja)",
-    "detected_language_name": "language name",
-    "extracted_text": "full original text from prescription",
-    "medications": [
-        {
-            "name": "medication name in original language",
-            "name_english": "medication name in English",
-            "dosage": "dosage amount",
-            "frequency": "frequency",
-            "timing": ["morning", "evening"],
-            "duration": "duration if specified",
-            "with_food": true/false
-        }
-    ]
-}
+        with Image.open(BytesIO(image_bytes)) as image:
+            # Phone cameras store portrait shots sideways plus an EXIF rotation
+            # that Gemini does not apply, so those are re-encoded upright too
+            orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+            if (
+                image.format in GEMINI_IMAGE_FORMATS
+                and max(image.size) <= MAX_IMAGE_DIMENSION
+                and orientation == 1
+            ):
+                return {
+                    'mime_type': Image.MIME[image.format],
+                    'data': image_bytes
+                }
+            
+            image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            
+            buffer = BytesIO()
+            image.save(buffer, format='JPEG', quality=85, optimize=True)
+    except UnidentifiedImageError:
+        # Let Gemini try formats Pillow cannot read
+        return {'mime_type': 'image/png', 'data': image_bytes}
+    
+    return {'mime_type': 'image/jpeg', 'data': buffer.getvalue()}
 
-If unclear, return: {"detected_language": "unknown", "detected_language_name": "Unknown", "extracted_text": "Unable to read", "medications": []}"""
-        
-        response = model.generate_content([prompt, image_part])
-        result = extract_json_from_response(response.text)
+def parse_analysis(text: str) -> PrescriptionAnalysis:
+    """Parse and validate a Gemini Vision reply in one step, falling back to
+    JSON extraction for replies wrapped in markdown or prose"""
+    try:
+        return PrescriptionAnalysis.model_validate_json(text)
+    except ValidationError:
+        return PrescriptionAnalysis.model_validate(extract_json_from_response(text))
+
+async def analyze_prescription_image(image_part: dict, preferred_language: str) -> PrescriptionAnalysis:
+    """Analyze prescription image using Gemini Vision, explaining each medication
+    in the preferred language"""
+    try:
+        model = create_gemini_model(
+            PRESCRIPTION_ANALYSIS_INSTRUCTIONS.get(preferred_language, PRESCRIPTION_ANALYSIS_INSTRUCTIONS['en']),
+            ANALYSIS_MAX_OUTPUT_TOKENS,
+            PrescriptionAnalysisSchema
+        )
         
-        if 'extracted_text' not in result:
-            result['extracted_text'] = 'No text extracted'
-        if 'medications' not in result:
-            result['medications'] = []
-        if 'detected_language' not in result:
-            result['detected_language'] = 'unknown'
-        if 'detected_language_name' not in result:
-            result['detected_language_name'] = 'Unknown'
-            
-        return result
+        response = await generate_content(model, [PRESCRIPTION_ANALYSIS_PROMPT, image_part])
+        return parse_analysis(response.text)
     except Exception as e:
-        logging.error(f"Prescription analysis error: {str(e)}")
+        logger.error("Prescription analysis error: %s", e)
         raise
 
+async def stream_prescription_analysis(image_part: dict, preferred_language: str):
+    """Stream Gemini Vision analysis.
+
+    Yields ('language', code) as soon as the detected language appears in the
+    partial reply, ('medication', ExtractedMedication) for each medication as
+    its object closes, then ('result', analysis) once the reply is complete.
+    Medications the incremental scan could not read are only in the result.
+    """
+    model = create_gemini_model(
+        PRESCRIPTION_ANALYSIS_INSTRUCTIONS.get(preferred_language, PRESCRIPTION_ANALYSIS_INSTRUCTIONS['en']),
+        ANALYSIS_MAX_OUTPUT_TOKENS,
+        PrescriptionAnalysisSchema
+    )
+    
+    text = ''
+    language_sent = False
+    medications_position = None
+    scanning = True
+    async for chunk_text in stream_content(model, [PRESCRIPTION_ANALYSIS_PROMPT, image_part]):
+        text += chunk_text
+        if not language_sent:
+            match = DETECTED_LANGUAGE_PATTERN.search(text)
+            if match:
+                language_sent = True
+                yield 'language', match.group(1)
+        
+        # Medications are only sent after the language they are tagged with
+        if not (language_sent and scanning):
+            continue
+        if medications_position is None:
+            match = MEDICATIONS_ARRAY_PATTERN.search(text)
+            if match is None:
+                continue
+            medications_position = match.end()
+        try:
+            medications, medications_position = completed_medications(text, medications_position)
+        except ValidationError:
+            scanning = False
+            continue
+        for medication in medications:
+            yield 'medication', medication
+    
+    result = parse_analysis(text)
+    if not language_sent:
+        yield 'language', result.detected_language
+    yield 'result', result
+
+def json_object_end(text: str, start: int) -> Optional[int]:
+    """Index just past the JSON object opening at text[start], or None if it
+    has not been closed yet"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+def completed_medications(text: str, position: int) -> tuple:
+    """Parse the medication objects closed since position in a partial reply.
+
+    Returns the new medications and the position to resume from.
+    """
+    medications = []
+    while True:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text) or text[position] != '{':
+            return medications, position
+        end = json_object_end(text, position)
+        if end is None:
+            return medications, position
+        medications.append(ExtractedMedication.model_validate_json(text[position:end]))
+        position = end
+
+def analysis_cache_key(image_hash: str, preferred_language: str) -> str:
+    """The analysis carries explanations, so it is cached per image and language"""
+    return f"{image_hash}:{cache_language(preferred_language)}"
+
+async def get_cached_analysis(image_hash: str, preferred_language: str) -> Optional[PrescriptionAnalysis]:
+    """Return an earlier analysis of the same image in the same language, if any"""
+    try:
+        cached = await db.image_cache.find_one(
+            {"_id": analysis_cache_key(image_hash, preferred_language)},
+            {"result": 1}
+        )
+        return PrescriptionAnalysis.model_validate(cached['result']) if cached else None
+    except Exception as e:
+        logger.error("Analysis cache lookup error: %s", e)
+        return None
+
+async def cache_analysis(image_hash: str, preferred_language: str, result: PrescriptionAnalysis) -> None:
+    await db.image_cache.update_one(
+        {"_id": analysis_cache_key(image_hash, preferred_language)},
+        {"$setOnInsert": {"result": result.model_dump(), "created_at": utc_now()}},
+        upsert=True
+    )
+
+async def insert_documents(collection, documents: List[dict]) -> bool:
+    """Insert documents keyed by their id, retrying connection failures; True once stored"""
+    # A retry of a write that actually landed is then a harmless duplicate-key error
+    documents = [{"_id": document["id"], **document} for document in documents]
+    for attempt in range(MONGO_WRITE_ATTEMPTS):
+        try:
+            await collection.insert_many(documents, ordered=False)
+            return True
+        except BulkWriteError as e:
+            if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details['writeErrors']):
+                logger.error("Error storing %s: %s", collection.name, e)
+                return False
+            return True
+        except ConnectionFailure as e:
+            logger.warning("Retrying %s write (attempt %d of %d): %s", collection.name, attempt + 1, MONGO_WRITE_ATTEMPTS, e)
+            await asyncio.sleep(MONGO_WRITE_RETRY_DELAY * 2 ** attempt)
+        except Exception as e:
+            logger.error("Error storing %s: %s", collection.name, e)
+            return False
+    logger.error("Giving up storing %d %s document(s)", len(documents), collection.name)
+    return False
+
+async def write_prescription_batches(prescription_queue: asyncio.Queue) -> None:
+    """Drain the queue into insert_many calls of up to PRESCRIPTION_BATCH_SIZE
+    documents, waiting at most PRESCRIPTION_BATCH_DELAY for a batch to fill"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await prescription_queue.get()]
+        deadline = loop.time() + PRESCRIPTION_BATCH_DELAY
+        while len(batch) < PRESCRIPTION_BATCH_SIZE and (timeout := deadline - loop.time()) > 0:
+            try:
+                batch.append(await asyncio.wait_for(prescription_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            await insert_documents(db.prescriptions, batch)
+        finally:
+            for _ in batch:
+                prescription_queue.task_done()
+
+def image_content_type(image_bytes: bytes) -> str:
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            return Image.MIME.get(image.format, "application/octet-stream")
+    except (UnidentifiedImageError, OSError):
+        return "application/octet-stream"
+
+async def store_image(image_hash: str, image_bytes: bytes) -> None:
+    """Keep the uploaded image in GridFS under its digest; a photo uploaded
+    again is stored only once"""
+    if await db.prescription_images.files.find_one({"_id": image_hash}, {"_id": 1}):
+        return
+    await prescription_images.upload_from_stream_with_id(
+        image_hash,
+        image_hash,
+        image_bytes,
+        metadata={"content_type": image_content_type(image_bytes)}
+    )
+
+async def store_prescription(
+    prescription: Prescription,
+    image_hash: str,
+    new_analysis: Optional[PrescriptionAnalysis] = None,
+    image_bytes: Optional[bytes] = None
+) -> None:
+    """Persist a prescription, caching a fresh image analysis and storing the
+    image alongside it.
+
+    The prescription is queued for the batched writer. The other writes are
+    independent (the cache upsert is idempotent and images are keyed by
+    digest), so they are issued concurrently rather than wrapped in a
+    transaction.
+    """
+    app.state.prescription_queue.put_nowait(prescription.model_dump())
+    writes = []
+    if new_analysis is not None:
+        writes.append(cache_analysis(image_hash, prescription.preferred_language, new_analysis))
+    if image_bytes is not None:
+        writes.append(store_image(image_hash, image_bytes))
+    for result in await asyncio.gather(*writes, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error("Error storing prescription: %s", result)
+
+def fallback_explanation() -> dict:
+    """Generic explanation used when Gemini cannot provide one"""
+    return {
+        'plain_explanation': "This medication is prescribed for your health.",
+        'why_timing_matters': "Timing helps maintain steady medication levels.",
+        'dosage_safety_reminder': "Always follow the prescribed dosage exactly."
+    }
+
+def cache_language(language: str) -> str:
+    """Language code as it affects the prompt; unsupported codes are answered in English"""
+    return language if language in SUPPORTED_LANGUAGES else 'en'
+
+def explanation_cache_key(med_name: str, dosage: str, frequency: str, target_language: str) -> tuple:
+    """Normalized key shared by single and batched explanation lookups"""
+    return (med_name.strip().lower(), dosage.strip(), frequency.strip(), cache_language(target_language))
+
+def with_explanation_defaults(result: dict) -> dict:
+    """Fill any explanation field Gemini left out"""
+    if 'plain_explanation' not in result:
+        result['plain_explanation'] = f"This medication is prescribed for your health condition."
+    if 'why_timing_matters' not in result:
+        result['why_timing_matters'] = "Taking medication at the right time helps maintain consistent levels."
+    if 'dosage_safety_reminder' not in result:
+        result['dosage_safety_reminder'] = "Always follow the prescribed dosage exactly."
+    return result
+
+def explanation_document_id(cache_key: tuple) -> dict:
+    """Mongo _id of a stored explanation; fields always in this order so _id
+    equality and $in lookups match. The model is part of the key so switching
+    GEMINI_MODEL does not keep serving the old model's explanations."""
+    name, dosage, frequency, language = cache_key
+    return {"model": GEMINI_MODEL, "name": name, "dosage": dosage, "frequency": frequency, "language": language}
+
+async def get_stored_explanations(cache_keys: List[tuple]) -> dict:
+    """Explanations persisted by earlier requests, by cache key"""
+    try:
+        cursor = db.medication_explanations.find(
+            {"_id": {"$in": [explanation_document_id(key) for key in cache_keys]}},
+            {"explanation": 1}
+        )
+        stored = {}
+        async for document in cursor:
+            key = tuple(document['_id'][field] for field in ('name', 'dosage', 'frequency', 'language'))
+            stored[key] = document['explanation']
+        return stored
+    except Exception as e:
+        logger.error("Stored explanation lookup error: %s", e)
+        return {}
+
+async def store_explanations(explanations: dict) -> None:
+    """Persist freshly generated explanations (by cache key) for later requests"""
+    if not explanations:
+        return
+    now = utc_now()
+    try:
+        await db.medication_explanations.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": explanation_document_id(key)},
+                    {"$setOnInsert": {"explanation": explanation, "created_at": now}},
+                    upsert=True
+                )
+                for key, explanation in explanations.items()
+            ],
+            ordered=False
+        )
+    except Exception as e:
+        logger.error("Explanation store error: %s", e)
+
 async def generate_medication_explanation(
     med_name: str, 
     dosage: str, 
@@ -183,160 +831,727 @@ async def generate_medication_explanation(
     target_language: str
 ) -> dict:
     """Generate plain language explanation with Nudge Theory"""
+    cache_key = explanation_cache_key(med_name, dosage, frequency, target_language)
+    cached = EXPLANATION_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("Explanation cache hit: %s", cache_key)
+        return cached
+    logger.debug("Explanation cache miss: %s", cache_key)
+    
+    stored = (await get_stored_explanations([cache_key])).get(cache_key)
+    if stored is not None:
+        EXPLANATION_CACHE[cache_key] = stored
+        return stored
+    
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = create_gemini_model(
+            EXPLANATION_INSTRUCTIONS.get(target_language, EXPLANATION_INSTRUCTIONS['en']),
+            EXPLANATION_MAX_OUTPUT_TOKENS,
+            MedicationExplanationSchema
+        )
         
-        prompt = f"""For medication '{med_name}' (dosage: '{dosage}', frequency: {frequency}):
-
-Provide explanation in {SUPPORTED_LANGUAGES.get(target_language, 'English')}:
-1. Simple explanation (what it does, 2-3 sentences)
-2. Why timing matters (Nudge Theory)
-3. Dosage safety reminder
-
-Return ONLY valid JSON:
-{{
-    "plain_explanation": "simple explanation",
-    "why_timing_matters": "why timing is important",
-    "dosage_safety_reminder": "safety reminder"
-}}"""
+        prompt = EXPLANATION_PROMPT.format(name=med_name, dosage=dosage, frequency=frequency)
         
-        response = model.generate_content(prompt)
-        result = extract_json_from_response(response.text)
+        response = await generate_content(model, prompt)
+        result = with_explanation_defaults(extract_json_from_response(response.text))
         
-        if 'plain_explanation' not in result:
-            result['plain_explanation'] = f"This medication is prescribed for your health condition."
-        if 'why_timing_matters' not in result:
-            result['why_timing_matters'] = "Taking medication at the right time helps maintain consistent levels."
-        if 'dosage_safety_reminder' not in result:
-            result['dosage_safety_reminder'] = "Always follow the prescribed dosage exactly."
-            
+        EXPLANATION_CACHE[cache_key] = result
+        await store_explanations({cache_key: result})
         return result
     except Exception as e:
-        logging.error(f"Explanation generation error: {str(e)}")
-        return {
-            'plain_explanation': f"This medication is prescribed for your health.",
-            'why_timing_matters': "Timing helps maintain steady medication levels.",
-            'dosage_safety_reminder': "Always follow the prescribed dosage exactly."
-        }
+        logger.error("Explanation generation error: %s", e)
+        return fallback_explanation()
 
-async def check_drug_interactions(
-    medication_name: str, 
-    current_medications: List[str], 
-    language: str
+async def generate_explanation_bounded(
+    med_name: str,
+    dosage: str,
+    frequency: str,
+    target_language: str
 ) -> dict:
-    """Check for drug interactions"""
+    """Generate an explanation while respecting the fan-out concurrency limit"""
+    async with EXPLANATION_CONCURRENCY:
+        return await generate_medication_explanation(med_name, dosage, frequency, target_language)
+
+async def generate_medication_explanations(medications: List[dict], target_language: str) -> List[dict]:
+    """Explain several medications (name, dosage, frequency) with one Gemini call.
+
+    Explanations cached in memory or stored in Mongo are reused. Batched
+    entries are matched back to the requested medications by index; any
+    medication missing from the response (or every one, if the call fails) is
+    explained separately.
+    """
+    keys = [
+        explanation_cache_key(med['name'], med['dosage'], med['frequency'], target_language)
+        for med in medications
+    ]
+    results = [EXPLANATION_CACHE.get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    logger.debug("Explanation cache: %d hits, %d misses", len(keys) - len(pending), len(pending))
+    if not pending:
+        return results
+    
+    stored = await get_stored_explanations([keys[i] for i in pending])
+    for i in pending:
+        if keys[i] in stored:
+            results[i] = EXPLANATION_CACHE[keys[i]] = stored[keys[i]]
+    pending = [i for i in pending if results[i] is None]
+    if not pending:
+        return results
+    
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = create_gemini_model(
+            BATCH_EXPLANATION_INSTRUCTIONS.get(target_language, BATCH_EXPLANATION_INSTRUCTIONS['en']),
+            BATCH_EXPLANATION_MAX_OUTPUT_TOKENS,
+            MedicationExplanationBatchSchema
+        )
+        
+        prompt = orjson.dumps([{'index': i, **medications[i]} for i in pending]).decode()
         
-        prompt = f"""Check if '{medication_name}' has contraindications with: {', '.join(current_medications)}.
+        response = await generate_content(model, prompt)
+        explanations = extract_json_from_response(response.text).get('explanations', [])
+        
+        for explanation in explanations:
+            if not isinstance(explanation, dict):
+                continue
+            i = explanation.pop('index', None)
+            if i in pending and results[i] is None:
+                results[i] = with_explanation_defaults(explanation)
+                EXPLANATION_CACHE[keys[i]] = results[i]
+        
+        await store_explanations({keys[i]: results[i] for i in pending if results[i] is not None})
+        
+        missing = [i for i in pending if results[i] is None]
+        if missing:
+            logger.warning("Batch explanation returned %d of %d medications", len(pending) - len(missing), len(pending))
+        pending = missing
+    except Exception as e:
+        logger.error("Batch explanation error: %s", e)
+    
+    if pending:
+        fallbacks = await asyncio.gather(
+            *[
+                generate_explanation_bounded(
+                    medications[i]['name'],
+                    medications[i]['dosage'],
+                    medications[i]['frequency'],
+                    target_language
+                )
+                for i in pending
+            ],
+            return_exceptions=True
+        )
+        for i, explanation in zip(pending, fallbacks):
+            if isinstance(explanation, Exception):
+                logger.error("Explanation generation error: %s", explanation)
+                explanation = fallback_explanation()
+            results[i] = explanation
+    
+    return results
+
+def explanation_request(med: ExtractedMedication) -> dict:
+    """Name, dosage and frequency of an extracted medication, as sent for explanation"""
+    return {
+        'name': med.display_name,
+        'dosage': med.dosage,
+        'frequency': med.frequency
+    }
 
-Provide in {SUPPORTED_LANGUAGES.get(language, 'English')}.
+def build_medication(
+    med: ExtractedMedication,
+    explanation_data: dict,
+    detected_language: str,
+    preferred_language: str,
+    created_at: datetime
+) -> Medication:
+    """Combine an extracted medication with its plain language explanation"""
+    full_explanation = f"{explanation_data['plain_explanation']} ⚠️ {explanation_data.get('dosage_safety_reminder', '')}"
+    
+    return Medication(
+        name=med.display_name,
+        dosage=med.dosage,
+        frequency=med.frequency,
+        timing=med.timing,
+        duration=med.duration,
+        with_food=med.with_food,
+        plain_language_explanation=full_explanation,
+        why_timing_matters=explanation_data['why_timing_matters'],
+        warnings=[explanation_data.get('dosage_safety_reminder', '')],
+        original_language=detected_language,
+        translated_to=preferred_language,
+        created_at=created_at
+    )
+
+async def explain_medication(
+    med: ExtractedMedication,
+    detected_language: str,
+    preferred_language: str,
+    created_at: datetime
+) -> Medication:
+    """Explain one extracted medication under the fan-out limit"""
+    request = explanation_request(med)
+    explanation_data = await generate_explanation_bounded(
+        request['name'],
+        request['dosage'],
+        request['frequency'],
+        preferred_language
+    )
+    return build_medication(med, explanation_data, detected_language, preferred_language, created_at)
+
+def start_medication(
+    med: ExtractedMedication,
+    detected_language: str,
+    preferred_language: str,
+    created_at: datetime
+):
+    """Build an extracted medication straight away if the analysis explained it,
+    otherwise start explaining it and return the pending task"""
+    explanation_data = embedded_explanation(med)
+    if explanation_data is None:
+        return asyncio.ensure_future(explain_medication(med, detected_language, preferred_language, created_at))
+    return build_medication(med, explanation_data, detected_language, preferred_language, created_at)
+
+def embedded_explanation(med: ExtractedMedication) -> Optional[dict]:
+    """The explanation Gemini returned alongside an extracted medication, if complete"""
+    explanation = {
+        'plain_explanation': med.plain_explanation,
+        'why_timing_matters': med.why_timing_matters,
+        'dosage_safety_reminder': med.dosage_safety_reminder
+    }
+    return explanation if all(explanation.values()) else None
+
+async def explain_extracted_medications(
+    valid_meds: List[ExtractedMedication],
+    detected_language: str,
+    preferred_language: str,
+    created_at: datetime
+) -> List[Medication]:
+    """Build medications from an analysis, explaining separately only those the
+    analysis returned without an explanation"""
+    explanations = [embedded_explanation(med) for med in valid_meds]
+    missing = [i for i, explanation in enumerate(explanations) if explanation is None]
+    if missing:
+        generated = await generate_medication_explanations(
+            [explanation_request(valid_meds[i]) for i in missing],
+            preferred_language
+        )
+        for i, explanation in zip(missing, generated):
+            explanations[i] = explanation
+    
+    return [
+        build_medication(med, explanation_data, detected_language, preferred_language, created_at)
+        for med, explanation_data in zip(valid_meds, explanations)
+    ]
 
-Return ONLY valid JSON:
-{{
-    "has_contraindications": true/false,
-    "warnings": ["list of warnings"],
-    "recommendations": "recommendations"
-}}"""
+def llm_cache_id(*key_parts) -> str:
+    return hashlib.sha256(orjson.dumps(key_parts)).hexdigest()
+
+async def get_cached_llm_response(*key_parts) -> Optional[dict]:
+    """A stored Gemini response for these key parts, if any"""
+    try:
+        cached = await db.llm_cache.find_one({"_id": llm_cache_id(*key_parts)}, {"response": 1})
+    except Exception as e:
+        logger.error("LLM cache lookup error: %s", e)
+        return None
+    return cached['response'] if cached else None
+
+async def cache_llm_response(response: dict, *key_parts) -> None:
+    try:
+        await db.llm_cache.update_one(
+            {"_id": llm_cache_id(*key_parts)},
+            {"$setOnInsert": {"response": response, "created_at": utc_now()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error("LLM cache store error: %s", e)
+
+async def check_drug_pair(
+    medication_name: str,
+    other_medication: str,
+    language: str,
+    fanout: asyncio.Semaphore
+) -> dict:
+    """Check one medication against one current medication, holding `fanout`
+    while Gemini is asked"""
+    cache_key = (medication_name.strip().lower(), other_medication.strip().lower(), cache_language(language))
+    cached = INTERACTION_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("Interaction cache hit: %s", cache_key)
+        return cached
+    logger.debug("Interaction cache miss: %s", cache_key)
+    
+    stored = await get_cached_llm_response(GEMINI_MODEL, "contraindication", *cache_key)
+    if stored is not None:
+        INTERACTION_CACHE[cache_key] = stored
+        return stored
+    
+    try:
+        model = create_gemini_model(
+            CONTRAINDICATION_INSTRUCTIONS.get(language, CONTRAINDICATION_INSTRUCTIONS['en']),
+            CONTRAINDICATION_MAX_OUTPUT_TOKENS,
+            ContraindicationSchema
+        )
+        
+        prompt = CONTRAINDICATION_PROMPT.format(name=medication_name, other=other_medication)
         
-        response = model.generate_content(prompt)
+        async with fanout:
+            response = await generate_content(model, prompt)
         result = extract_json_from_response(response.text)
+        
+        INTERACTION_CACHE[cache_key] = result
+        await cache_llm_response(result, GEMINI_MODEL, "contraindication", *cache_key)
         return result
     except Exception as e:
-        logging.error(f"Contraindication check error: {str(e)}")
+        logger.error("Contraindication check error: %s", e)
         raise
 
+async def check_drug_interactions(
+    medication_name: str, 
+    current_medications: List[str], 
+    language: str
+) -> dict:
+    """Check for drug interactions, one pair per current medication.
+
+    Pairs are checked concurrently and cached individually, so adding a
+    medication to an existing list only asks Gemini about the new pairs.
+    """
+    others = {}
+    for med in current_medications:
+        if med.strip():
+            others.setdefault(med.strip().lower(), med.strip())
+    if not others:
+        return {"has_contraindications": False, "warnings": [], "recommendations": ""}
+    
+    fanout = asyncio.Semaphore(INTERACTION_FANOUT)
+    results = await asyncio.gather(
+        *[check_drug_pair(medication_name, other, language, fanout) for other in others.values()]
+    )
+    
+    flagged = [result for result in results if result.get('has_contraindications')]
+    return {
+        "has_contraindications": bool(flagged),
+        "warnings": list(dict.fromkeys(
+            warning for result in results for warning in result.get('warnings', [])
+        )),
+        "recommendations": "\n".join(
+            result['recommendations'] for result in (flagged or results[:1]) if result.get('recommendations')
+        )
+    }
+
 @api_router.get("/")
 async def root():
     return {"message": "PillGuide API - Multi-Language Prescription System"}
 
+# The language list is fixed at startup, so its response body is serialized
+# once and clients may cache it for a day
+LANGUAGES_RESPONSE_BODY = orjson.dumps({"languages": SUPPORTED_LANGUAGES})
+
 @api_router.get("/languages", response_model=LanguageList)
 async def get_supported_languages():
-    return {"languages": SUPPORTED_LANGUAGES}
+    return Response(
+        content=LANGUAGES_RESPONSE_BODY,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=86400"}
+    )
+
+async def analyze_prescription(
+    image_bytes: bytes,
+    image_hash: str,
+    patient_id: Optional[str],
+    preferred_language: str
+) -> tuple:
+    """Analyze an uploaded prescription image and explain its medications.
+
+    Returns the prescription and, when Gemini analyzed the image rather than
+    the analysis cache answering, the fresh analysis to cache.
+    """
+    # Re-uploads of the same photo reuse the earlier Gemini Vision analysis
+    extraction_result = await get_cached_analysis(image_hash, preferred_language)
+    analysis_cached = extraction_result is not None
+    if not analysis_cached:
+        extraction_result = await analyze_prescription_image(
+            await asyncio.to_thread(prepare_prescription_image, image_bytes),
+            preferred_language
+        )
+    
+    detected_lang = extraction_result.detected_language
+    
+    valid_meds = [med for med in extraction_result.medications if med.name]
+    
+    # One timestamp for the prescription and all of its medications
+    now = utc_now()
+    medications_with_explanation = await explain_extracted_medications(
+        valid_meds,
+        detected_lang,
+        preferred_language,
+        now
+    )
+    
+    prescription = Prescription(
+        patient_id=patient_id,
+        image_data=image_hash,
+        extracted_text=extraction_result.extracted_text,
+        detected_language=detected_lang,
+        preferred_language=preferred_language,
+        medications=medications_with_explanation,
+        analysis_complete=True,
+        created_at=now
+    )
+    return prescription, None if analysis_cached else extraction_result
+
+async def analyze_and_store_prescription(
+    image_bytes: bytes,
+    image_hash: str,
+    patient_id: Optional[str],
+    preferred_language: str,
+    background_tasks: BackgroundTasks
+) -> Prescription:
+    """Analyze an uploaded prescription; it is stored after the response is sent"""
+    try:
+        prescription, new_analysis = await analyze_prescription(
+            image_bytes,
+            image_hash,
+            patient_id,
+            preferred_language
+        )
+    except orjson.JSONDecodeError as e:
+        logger.error("JSON parsing error: %s", e)
+        raise HTTPException(
+            status_code=500, 
+            detail="Failed to parse AI response. The prescription image may be unclear."
+        )
+    except Exception as e:
+        logger.error("Error analyzing prescription: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to analyze prescription: {str(e)}")
+    
+    background_tasks.add_task(store_prescription, prescription, image_hash, new_analysis, image_bytes)
+    return prescription
 
 @api_router.post("/prescriptions/upload", response_model=Prescription)
-async def upload_prescription(data: PrescriptionCreate):
+async def upload_prescription(data: PrescriptionCreate, background_tasks: BackgroundTasks):
+    ensure_image_size(data.image_base64)
     try:
-        extraction_result = await analyze_prescription_image(
-            data.image_base64, 
-            data.preferred_language
+        image_bytes, image_hash = await asyncio.to_thread(decode_prescription_image, data.image_base64)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Invalid base64 image data")
+    return await analyze_and_store_prescription(
+        image_bytes,
+        image_hash,
+        data.patient_id,
+        data.preferred_language,
+        background_tasks
+    )
+
+@api_router.post("/prescriptions/upload/file", response_model=Prescription)
+async def upload_prescription_file(
+    background_tasks: BackgroundTasks,
+    image: UploadFile = File(...),
+    patient_id: Optional[str] = Form(None),
+    preferred_language: str = Form("en")
+):
+    """Multipart variant of /prescriptions/upload that takes the raw image bytes,
+    avoiding the base64 inflation and decode of the JSON body"""
+    image_bytes = await image.read(MAX_IMAGE_BYTES + 1)
+    if len(image_bytes) > MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="Prescription image is too large")
+    image_hash = (await asyncio.to_thread(hashlib.sha256, image_bytes)).hexdigest()
+    return await analyze_and_store_prescription(
+        image_bytes,
+        image_hash,
+        patient_id,
+        preferred_language,
+        background_tasks
+    )
+
+async def process_prescription(placeholder: Prescription, image_bytes: bytes, image_hash: str) -> None:
+    """Analyze a prescription accepted by /prescriptions/upload/async and fill
+    in its stored placeholder; failures are recorded on the document"""
+    try:
+        prescription, new_analysis = await analyze_prescription(
+            image_bytes,
+            image_hash,
+            placeholder.patient_id,
+            placeholder.preferred_language
+        )
+    except Exception as e:
+        logger.error("Error analyzing prescription %s: %s", placeholder.id, e)
+        await db.prescriptions.update_one(
+            {"_id": placeholder.id},
+            {"$set": {"analysis_error": f"Failed to analyze prescription: {str(e)}"}}
         )
+        return
+    
+    writes = [
+        db.prescriptions.update_one(
+            {"_id": placeholder.id},
+            {"$set": prescription.model_dump(exclude={"id", "created_at"})}
+        ),
+        store_image(image_hash, image_bytes)
+    ]
+    if new_analysis is not None:
+        writes.append(cache_analysis(image_hash, placeholder.preferred_language, new_analysis))
+    for result in await asyncio.gather(*writes, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error("Error storing prescription %s: %s", placeholder.id, result)
+
+@api_router.post("/prescriptions/upload/async", response_model=Prescription, status_code=202)
+async def upload_prescription_async(data: PrescriptionCreate, background_tasks: BackgroundTasks):
+    """Accept a prescription and analyze it after responding.
+
+    The response is the stored placeholder (analysis_complete false); poll
+    GET /prescriptions/{id}/status, then fetch GET /prescriptions/{id} once
+    complete.
+    """
+    ensure_image_size(data.image_base64)
+    try:
+        image_bytes, image_hash = await asyncio.to_thread(decode_prescription_image, data.image_base64)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Invalid base64 image data")
+    
+    placeholder = Prescription(
+        patient_id=data.patient_id,
+        image_data=image_hash,
+        detected_language="unknown",
+        preferred_language=data.preferred_language,
+        medications=[]
+    )
+    try:
+        await db.prescriptions.insert_one({"_id": placeholder.id, **placeholder.model_dump()})
+    except Exception as e:
+        logger.error("Error queueing prescription: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to queue prescription: {str(e)}")
+    
+    background_tasks.add_task(process_prescription, placeholder, image_bytes, image_hash)
+    return placeholder
+
+@api_router.get("/prescriptions/{prescription_id}/status")
+async def get_prescription_status(prescription_id: str):
+    prescription = await db.prescriptions.find_one(
+        {"id": prescription_id},
+        {"_id": 0, "analysis_complete": 1, "analysis_error": 1}
+    )
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    return {
+        "id": prescription_id,
+        "analysis_complete": prescription.get("analysis_complete", False),
+        "error": prescription.get("analysis_error")
+    }
+
+def ndjson_event(event: str, data) -> bytes:
+    return orjson.dumps({"event": event, "data": data}, option=orjson.OPT_UTC_Z) + b"\n"
+
+async def prescription_upload_events(
+    image_bytes: bytes,
+    image_hash: str,
+    patient_id: Optional[str],
+    preferred_language: str
+):
+    """Analyze a prescription, yielding NDJSON progress events"""
+    try:
+        extraction_result = await get_cached_analysis(image_hash, preferred_language)
+        analysis_cached = extraction_result is not None
+        image_part = None if analysis_cached else await asyncio.to_thread(prepare_prescription_image, image_bytes)
+        # This generator outlives the request handler; store the upload while
+        # the analysis runs rather than holding it for the rest of the stream
+        image_stored = asyncio.ensure_future(store_image(image_hash, image_bytes))
+        del image_bytes
+        now = utc_now()
         
-        detected_lang = extraction_result['detected_language']
+        # Medications the analysis already explained are sent as soon as they
+        # are read; the rest are explained concurrently and sent as each completes
+        medications = []
+        if analysis_cached:
+            detected_lang = extraction_result.detected_language
+            yield ndjson_event('language', detected_lang)
+            extracted = extraction_result.medications
+        else:
+            extracted = []
+            async for kind, value in stream_prescription_analysis(image_part, preferred_language):
+                if kind == 'language':
+                    detected_lang = value
+                    yield ndjson_event('language', value)
+                elif kind == 'medication':
+                    extracted.append(value)
+                    if value.name:
+                        medications.append(start_medication(value, detected_lang, preferred_language, now))
+                        if isinstance(medications[-1], Medication):
+                            yield ndjson_event('medication', medications[-1].model_dump())
+                else:
+                    extraction_result = value
+            # Anything the incremental scan missed is picked up from the full reply
+            extracted = extraction_result.medications[len(extracted):]
         
-        medications_with_explanation = []
-        for med in extraction_result.get("medications", []):
-            if not med.get('name'):
-                continue
-            
-            med_name = med.get('name_english', med.get('name', 'Unknown'))
-            
-            explanation_data = await generate_medication_explanation(
-                med_name,
-                med.get('dosage', 'Unknown'),
-                med.get('frequency', 'as prescribed'),
-                data.preferred_language
-            )
-            
-            full_explanation = f"{explanation_data['plain_explanation']} ⚠️ {explanation_data.get('dosage_safety_reminder', '')}"
-            
-            medication_obj = Medication(
-                name=med_name,
-                dosage=med.get('dosage', 'As prescribed'),
-                frequency=med.get('frequency', 'As prescribed'),
-                timing=med.get('timing', []),
-                duration=med.get('duration'),
-                with_food=med.get('with_food', False),
-                plain_language_explanation=full_explanation,
-                why_timing_matters=explanation_data['why_timing_matters'],
-                warnings=[explanation_data.get('dosage_safety_reminder', '')],
-                original_language=detected_lang,
-                translated_to=data.preferred_language
-            )
-            medications_with_explanation.append(medication_obj)
+        for med in extracted:
+            if med.name:
+                medications.append(start_medication(med, detected_lang, preferred_language, now))
+                if isinstance(medications[-1], Medication):
+                    yield ndjson_event('medication', medications[-1].model_dump())
+        
+        for completed in asyncio.as_completed([m for m in medications if isinstance(m, asyncio.Future)]):
+            medication = await completed
+            yield ndjson_event('medication', medication.model_dump())
+        
+        medications_with_explanation = [
+            m.result() if isinstance(m, asyncio.Future) else m for m in medications
+        ]
         
         prescription = Prescription(
-            patient_id=data.patient_id,
-            image_data=data.image_base64[:100],
-            extracted_text=extraction_result.get("extracted_text", ""),
+            patient_id=patient_id,
+            image_data=image_hash,
+            extracted_text=extraction_result.extracted_text,
             detected_language=detected_lang,
-            preferred_language=data.preferred_language,
+            preferred_language=preferred_language,
             medications=medications_with_explanation,
-            analysis_complete=True
+            analysis_complete=True,
+            created_at=now
         )
         
-        doc = prescription.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        for med in doc['medications']:
-            med['created_at'] = med['created_at'].isoformat()
-        
-        await db.prescriptions.insert_one(doc)
+        yield ndjson_event('done', prescription.model_dump())
         
-        return prescription
-        
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON parsing error: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail="Failed to parse AI response. The prescription image may be unclear."
-        )
+        # The client has everything it needs; persist before closing the stream
+        await store_prescription(prescription, image_hash, None if analysis_cached else extraction_result)
+        try:
+            await image_stored
+        except Exception as e:
+            logger.error("Error storing prescription image: %s", e)
     except Exception as e:
-        logging.error(f"Error analyzing prescription: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to analyze prescription: {str(e)}")
+        logger.error("Error streaming prescription analysis: %s", e)
+        yield ndjson_event('error', f"Failed to analyze prescription: {str(e)}")
+
+@api_router.post("/prescriptions/upload/stream")
+async def upload_prescription_stream(data: PrescriptionCreate):
+    """Stream the analysis as NDJSON: a language event, one medication event per
+    medication as its explanation completes, then done with the prescription
+    (stored after the event is sent), or error."""
+    ensure_image_size(data.image_base64)
+    # Decode before streaming so a bad body is still a 400 rather than an error event
+    try:
+        image_bytes, image_hash = await asyncio.to_thread(decode_prescription_image, data.image_base64)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Invalid base64 image data")
+    return StreamingResponse(
+        prescription_upload_events(image_bytes, image_hash, data.patient_id, data.preferred_language),
+        media_type="application/x-ndjson"
+    )
+
+# Documents per chunk written to the socket, in line with the first batch the
+# driver fetches from the server (101 documents)
+JSON_STREAM_BATCH_SIZE = 100
+
+async def json_array_stream(cursor):
+    """Serialize documents from an async cursor as one JSON array, a batch of
+    documents at a time"""
+    prefix = b"["
+    batch = []
+    async for document in cursor:
+        batch.append(orjson.dumps(document, option=orjson.OPT_UTC_Z))
+        if len(batch) == JSON_STREAM_BATCH_SIZE:
+            yield prefix + b",".join(batch)
+            prefix = b","
+            batch = []
+    if batch:
+        yield prefix + b",".join(batch) + b"]"
+    else:
+        yield b"[]" if prefix == b"[" else b"]"
+
+# Listings sort newest first with id as tie-breaker, since a bulk insert or an
+# upload's medications share one created_at. Paging on id rather than _id also
+# covers older documents keyed by ObjectId.
+LIST_SORT = {"created_at": -1, "id": -1}
+# Listings requested without a limit return up to this many documents, the
+# size they had before paging was added
+UNPAGINATED_LIST_LIMIT = 1000
+
+def keyset_filter(before: Optional[datetime], before_id: Optional[str]) -> dict:
+    """Match documents after the (created_at, id) cursor in LIST_SORT order"""
+    if before is None:
+        return {}
+    if before_id is None:
+        return {"created_at": {"$lt": before}}
+    return {"$or": [
+        {"created_at": {"$lt": before}},
+        {"created_at": before, "id": {"$lt": before_id}}
+    ]}
 
 @api_router.get("/prescriptions", response_model=List[Prescription])
-async def get_prescriptions(patient_id: Optional[str] = None):
-    query = {"patient_id": patient_id} if patient_id else {}
-    prescriptions = await db.prescriptions.find(query, {"_id": 0}).to_list(1000)
+async def get_prescriptions(
+    patient_id: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    full: bool = True,
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None
+):
+    """List prescriptions, newest first.
+
+    Without `limit` up to UNPAGINATED_LIST_LIMIT prescriptions are returned;
+    pass one to page. For deep pages pass the created_at and id of the last prescription
+    received as `before` and `before_id` instead of increasing `skip`; the
+    index then seeks straight to the next page rather than walking past every
+    skipped document.
+    """
+    query = keyset_filter(before, before_id)
+    if patient_id:
+        query["patient_id"] = patient_id
+    pipeline = [
+        {"$match": query},
+        {"$sort": LIST_SORT},
+        {"$skip": skip},
+        {"$limit": limit or UNPAGINATED_LIST_LIMIT},
+        {"$project": {"_id": 0} if full else PRESCRIPTION_LIST_PROJECTION}
+    ]
+    # Documents are written from Prescription.model_dump(), so they are already
+    # in response shape; stream them as they come off the cursor instead of
+    # materializing and re-validating the whole page
+    return StreamingResponse(
+        json_array_stream(await db.prescriptions.aggregate(pipeline)),
+        media_type="application/json"
+    )
+
+@api_router.get("/prescriptions/{prescription_id}", response_model=Prescription)
+async def get_prescription(prescription_id: str):
+    prescription = await db.prescriptions.find_one({"id": prescription_id}, {"_id": 0})
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    return prescription
+
+@api_router.get("/prescriptions/{prescription_id}/image")
+async def get_prescription_image(prescription_id: str):
+    """Stream the uploaded image of a prescription from GridFS"""
+    prescription = await db.prescriptions.find_one({"id": prescription_id}, {"image_data": 1})
+    if not prescription or not prescription.get('image_data'):
+        raise HTTPException(status_code=404, detail="Prescription image not found")
+    try:
+        image = await prescription_images.open_download_stream(prescription['image_data'])
+    except NoFile:
+        raise HTTPException(status_code=404, detail="Prescription image not found")
+    
+    async def chunks():
+        while chunk := await image.readchunk():
+            yield chunk
     
-    for prescription in prescriptions:
-        if isinstance(prescription['created_at'], str):
-            prescription['created_at'] = datetime.fromisoformat(prescription['created_at'])
-        for med in prescription.get('medications', []):
-            if isinstance(med['created_at'], str):
-                med['created_at'] = datetime.fromisoformat(med['created_at'])
+    return StreamingResponse(
+        chunks(),
+        media_type=(image.metadata or {}).get("content_type", "application/octet-stream")
+    )
+
+def build_manual_medication(data: MedicationCreate, explanation_data: dict, created_at: datetime) -> Medication:
+    """Combine a manually entered medication with its plain language explanation"""
+    full_explanation = f"{explanation_data['plain_explanation']} ⚠️ {explanation_data.get('dosage_safety_reminder', '')}"
     
-    return prescriptions
+    return Medication(
+        name=data.name,
+        dosage=data.dosage,
+        frequency=data.frequency,
+        timing=data.timing,
+        duration=data.duration,
+        with_food=data.with_food,
+        plain_language_explanation=full_explanation,
+        why_timing_matters=explanation_data['why_timing_matters'],
+        warnings=[explanation_data.get('dosage_safety_reminder', '')],
+        translated_to=data.preferred_language,
+        created_at=created_at
+    )
 
 @api_router.post("/medications", response_model=Medication)
 async def add_medication_manually(data: MedicationCreate):
@@ -348,40 +1563,69 @@ async def add_medication_manually(data: MedicationCreate):
             data.preferred_language
         )
         
-        full_explanation = f"{explanation_data['plain_explanation']} ⚠️ {explanation_data.get('dosage_safety_reminder', '')}"
-        
-        medication = Medication(
-            name=data.name,
-            dosage=data.dosage,
-            frequency=data.frequency,
-            timing=data.timing,
-            duration=data.duration,
-            with_food=data.with_food,
-            plain_language_explanation=full_explanation,
-            why_timing_matters=explanation_data['why_timing_matters'],
-            warnings=[explanation_data.get('dosage_safety_reminder', '')],
-            translated_to=data.preferred_language
-        )
+        medication = build_manual_medication(data, explanation_data, utc_now())
         
-        doc = medication.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        
-        await db.medications.insert_one(doc)
+        # Stored before answering so the client's follow-up GET sees it
+        if not await insert_documents(db.medications, [medication.model_dump()]):
+            raise RuntimeError("medication was not stored")
         
         return medication
     except Exception as e:
-        logging.error(f"Error adding medication: {str(e)}")
+        logger.error("Error adding medication: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to add medication: {str(e)}")
 
+@api_router.post("/medications/bulk", response_model=List[Medication])
+async def add_medications_bulk(items: List[MedicationCreate]):
+    """Add several medications with one batched explanation call per language
+    and a single insert"""
+    if not items:
+        return []
+    if len(items) > MAX_BULK_MEDICATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_MEDICATIONS} medications per request")
+    try:
+        by_language = {}
+        for i, item in enumerate(items):
+            by_language.setdefault(item.preferred_language, []).append(i)
+        
+        batches = await asyncio.gather(*[
+            generate_medication_explanations(
+                [{'name': items[i].name, 'dosage': items[i].dosage, 'frequency': items[i].frequency} for i in indices],
+                language
+            )
+            for language, indices in by_language.items()
+        ])
+        
+        explanations = [None] * len(items)
+        for indices, batch in zip(by_language.values(), batches):
+            for i, explanation_data in zip(indices, batch):
+                explanations[i] = explanation_data
+        
+        now = utc_now()
+        medications = [
+            build_manual_medication(item, explanation_data, now)
+            for item, explanation_data in zip(items, explanations)
+        ]
+        
+        if not await insert_documents(db.medications, MEDICATION_LIST.dump_python(medications)):
+            raise RuntimeError("medications were not stored")
+        
+        return medications
+    except Exception as e:
+        logger.error("Error adding medications: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to add medications: {str(e)}")
+
 @api_router.get("/medications", response_model=List[Medication])
-async def get_medications():
-    medications = await db.medications.find({}, {"_id": 0}).to_list(1000)
-    
-    for med in medications:
-        if isinstance(med['created_at'], str):
-            med['created_at'] = datetime.fromisoformat(med['created_at'])
-    
-    return medications
+async def get_medications(
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None
+):
+    """List manually added medications, newest first; `before` and
+    `before_id` page like GET /prescriptions"""
+    query = keyset_filter(before, before_id)
+    cursor = db.medications.find(query, {"_id": 0}).sort(LIST_SORT).skip(skip).limit(limit or UNPAGINATED_LIST_LIMIT)
+    return StreamingResponse(json_array_stream(cursor), media_type="application/json")
 
 @api_router.post("/contraindications/check", response_model=ContraindictionResult)
 async def check_contraindications(data: ContraindictionCheck):
@@ -393,11 +1637,30 @@ async def check_contraindications(data: ContraindictionCheck):
         )
         return ContraindictionResult(**result)
     except Exception as e:
-        logging.error(f"Error checking contraindications: {str(e)}")
+        logger.error("Error checking contraindications: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to check contraindications: {str(e)}")
 
 app.include_router(api_router)
 
+class RequestSizeLimitMiddleware:
+    """Reject oversized uploads before the body is read and parsed"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > MAX_REQUEST_BYTES:
+                        response = ORJSONResponse(status_code=413, content={"detail": "Request body too large"})
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+app.add_middleware(RequestSizeLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -406,12 +1669,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+@app.on_event("startup")
+async def start_log_listener():
+    # Records logged at import time wait in the queue until this runs
+    log_listener.start()
+
+@app.on_event("startup")
+async def ensure_indexes():
+    await db.prescriptions.create_index([("patient_id", 1), ("created_at", -1), ("id", -1)])
+    await db.prescriptions.create_index([("created_at", -1), ("id", -1)])
+    # Older documents are keyed by ObjectId, so single-prescription lookups go by id
+    await db.prescriptions.create_index("id")
+    await db.medications.create_index([("created_at", -1), ("id", -1)])
+    await db.image_cache.create_index("created_at", expireAfterSeconds=IMAGE_CACHE_TTL_SECONDS)
+    await db.llm_cache.create_index("created_at", expireAfterSeconds=LLM_CACHE_TTL_SECONDS)
+    await db.medication_explanations.create_index("created_at", expireAfterSeconds=LLM_CACHE_TTL_SECONDS)
+
+@app.on_event("startup")
+async def open_gemini_channel():
+    # All models share the SDK's process-wide async client, which multiplexes
+    # every call over one HTTP/2 gRPC channel. Creating it here binds it to the
+    # serving event loop and keeps its setup off the first user request.
+    # Without a key it would fail on missing credentials, so leave that to the
+    # AI requests and keep serving the rest.
+    if GEMINI_API_KEY:
+        genai_client.get_default_generative_async_client()
+    
+    # Build every model (and convert its response schema) up front, so no
+    # request pays for it the first time a language is used
+    for instructions, max_output_tokens, response_schema in (
+        (PRESCRIPTION_ANALYSIS_INSTRUCTIONS, ANALYSIS_MAX_OUTPUT_TOKENS, PrescriptionAnalysisSchema),
+        (EXPLANATION_INSTRUCTIONS, EXPLANATION_MAX_OUTPUT_TOKENS, MedicationExplanationSchema),
+        (BATCH_EXPLANATION_INSTRUCTIONS, BATCH_EXPLANATION_MAX_OUTPUT_TOKENS, MedicationExplanationBatchSchema),
+        (CONTRAINDICATION_INSTRUCTIONS, CONTRAINDICATION_MAX_OUTPUT_TOKENS, ContraindicationSchema),
+    ):
+        for system_instruction in instructions.values():
+            create_gemini_model(system_instruction, max_output_tokens, response_schema)
+
+@app.on_event("startup")
+async def start_prescription_writer():
+    app.state.prescription_queue = asyncio.Queue()
+    app.state.prescription_writer = asyncio.create_task(
+        write_prescription_batches(app.state.prescription_queue)
+    )
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    # Let queued prescriptions reach Mongo before the client goes away
+    try:
+        await asyncio.wait_for(app.state.prescription_queue.join(), PRESCRIPTION_FLUSH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error("Dropping %d unwritten prescription(s) on shutdown", app.state.prescription_queue.qsize())
+    app.state.prescription_writer.cancel()
+    await client.close()
+    # Flush whatever is still queued
+    log_listener.stop()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    # "auto" picks uvloop and httptools where they are installed, cutting
+    # per-request event loop and parsing overhead for the many concurrent
+    # Gemini and Mongo calls each upload makes; uvloop is not available on
+    # Windows, which falls back to asyncio
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=int(os.environ.get('PORT', '8001')),
+        loop="auto",
+        http="auto"
+    )
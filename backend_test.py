@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
-import requests
+import asyncio
+import httpx
 import json
 import base64
 import sys
@@ -14,6 +15,7 @@ class PillGuideAPITester:
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        self.client = None
 
     def log_test(self, name, status, message="", response_data=None):
         """Log test results"""
@@ -31,27 +33,17 @@ class PillGuideAPITester:
             "response_data": response_data
         })
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
+    async def run_test(self, name, method, endpoint, expected_status, data=None, headers=None, files=None, form=None):
         """Run a single API test"""
-        url = f"{self.base_url}/{endpoint}"
-        test_headers = {'Content-Type': 'application/json'}
-        if headers:
-            test_headers.update(headers)
-
         print(f"\n🔍 Testing {name}...")
-        print(f"  URL: {url}")
+        print(f"  URL: {self.base_url}/{endpoint}")
         
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=test_headers, timeout=30)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=test_headers, timeout=30)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=test_headers, timeout=30)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=test_headers, timeout=30)
-
-            print(f"  Status Code: {response.status_code}")
+            response = await self.client.request(
+                method, endpoint, json=data, headers=headers, files=files, data=form
+            )
+
+            print(f"  {name} Status Code: {response.status_code}")
             
             success = response.status_code == expected_status
             response_json = {}
@@ -68,7 +60,7 @@ class PillGuideAPITester:
                 self.log_test(name, False, f"Expected {expected_status}, got {response.status_code}", response_json)
                 return False, response_json
 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             self.log_test(name, False, "Request timeout (30s)")
             return False, {"error": "timeout"}
         except Exception as e:
@@ -82,16 +74,16 @@ class PillGuideAPITester:
         test_image_b64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
         return test_image_b64
 
-    def test_root_endpoint(self):
+    async def test_root_endpoint(self):
         """Test the root API endpoint"""
-        return self.run_test(
+        return await self.run_test(
             "Root Endpoint",
             "GET",
             "",
             200
         )
 
-    def test_upload_prescription_endpoint(self):
+    async def test_upload_prescription_endpoint(self):
         """Test prescription upload with test image"""
         print("\n📸 Testing prescription upload with base64 image...")
         
@@ -101,7 +93,7 @@ class PillGuideAPITester:
         }
         
         # This test might take longer due to AI processing
-        return self.run_test(
+        return await self.run_test(
             "Upload Prescription (AI Processing)",
             "POST", 
             "prescriptions/upload",
@@ -109,16 +101,97 @@ class PillGuideAPITester:
             test_data
         )
 
-    def test_get_prescriptions(self):
+    async def test_upload_prescription_file(self):
+        """Test multipart prescription upload with the raw image bytes"""
+        files = {
+            "image": ("prescription.png", base64.b64decode(self.create_test_prescription_image()), "image/png")
+        }
+        
+        return await self.run_test(
+            "Upload Prescription File (AI Processing)",
+            "POST",
+            "prescriptions/upload/file",
+            200,
+            files=files,
+            form={"patient_id": "test-patient-001", "preferred_language": "en"}
+        )
+
+    async def test_upload_prescription_stream(self):
+        """Test streamed prescription upload, which ends with a done event"""
+        test_data = {
+            "image_base64": self.create_test_prescription_image(),
+            "patient_id": "test-patient-001"
+        }
+        
+        success, response = await self.run_test(
+            "Upload Prescription Stream (AI Processing)",
+            "POST",
+            "prescriptions/upload/stream",
+            200,
+            test_data
+        )
+        if success:
+            lines = response.get("raw_response", "").strip().splitlines()
+            last_event = json.loads(lines[-1]).get("event") if lines else None
+            if last_event != "done":
+                print(f"  ⚠️ Stream ended with {last_event!r} instead of 'done'")
+        return success, response
+
+    async def test_upload_prescription_async(self):
+        """Test the 202 upload flow: accept, poll status, then fetch the prescription"""
+        test_data = {
+            "image_base64": self.create_test_prescription_image(),
+            "patient_id": "test-patient-001"
+        }
+        
+        success, response = await self.run_test(
+            "Upload Prescription Async",
+            "POST",
+            "prescriptions/upload/async",
+            202,
+            test_data
+        )
+        if not success:
+            return success, response
+        
+        prescription_id = response.get("id")
+        for _ in range(30):
+            success, status = await self.run_test(
+                "Prescription Status",
+                "GET",
+                f"prescriptions/{prescription_id}/status",
+                200
+            )
+            if not success or status.get("analysis_complete") or status.get("error"):
+                break
+            await asyncio.sleep(2)
+        
+        return await self.run_test(
+            "Get Prescription",
+            "GET",
+            f"prescriptions/{prescription_id}",
+            200
+        )
+
+    async def test_get_prescription_image(self, prescription_id):
+        """Test downloading the stored image of an uploaded prescription"""
+        return await self.run_test(
+            "Get Prescription Image",
+            "GET",
+            f"prescriptions/{prescription_id}/image",
+            200
+        )
+
+    async def test_get_prescriptions(self):
         """Test getting all prescriptions"""
-        return self.run_test(
+        return await self.run_test(
             "Get All Prescriptions",
             "GET",
             "prescriptions",
             200
         )
 
-    def test_add_manual_medication(self):
+    async def test_add_manual_medication(self):
         """Test adding medication manually"""
         test_medication = {
             "name": "Test Metformin",
@@ -129,7 +202,7 @@ class PillGuideAPITester:
             "with_food": True
         }
         
-        return self.run_test(
+        return await self.run_test(
             "Add Manual Medication (AI Processing)",
             "POST",
             "medications", 
@@ -137,23 +210,38 @@ class PillGuideAPITester:
             test_medication
         )
 
-    def test_get_medications(self):
+    async def test_add_medications_bulk(self):
+        """Test adding several medications in one request"""
+        test_medications = [
+            {"name": "Test Lisinopril", "dosage": "10mg", "frequency": "Once daily", "timing": ["morning"]},
+            {"name": "Test Atorvastatin", "dosage": "20mg", "frequency": "Once daily", "timing": ["bedtime"]}
+        ]
+        
+        return await self.run_test(
+            "Add Medications Bulk (AI Processing)",
+            "POST",
+            "medications/bulk",
+            200,
+            test_medications
+        )
+
+    async def test_get_medications(self):
         """Test getting all medications"""
-        return self.run_test(
+        return await self.run_test(
             "Get All Medications",
             "GET",
             "medications",
             200
         )
 
-    def test_contraindication_check(self):
+    async def test_contraindication_check(self):
         """Test contraindication checking"""
         test_data = {
             "medication_name": "Aspirin",
             "current_medications": ["Warfarin", "Ibuprofen"]
         }
         
-        return self.run_test(
+        return await self.run_test(
             "Check Contraindications (AI Processing)",
             "POST",
             "contraindications/check",
@@ -161,39 +249,57 @@ class PillGuideAPITester:
             test_data
         )
 
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Run all backend API tests"""
         print("=" * 60)
         print("🧪 PILLGUIDE API TESTING STARTED")
         print("=" * 60)
         print(f"Base URL: {self.base_url}")
         
-        # Test basic connectivity
-        success, _ = self.test_root_endpoint()
-        if not success:
-            print("❌ Root endpoint failed - stopping tests")
-            return self.generate_report()
+        # One pooled client for the whole run, so tests share kept-alive
+        # connections instead of each paying for a TLS handshake
+        # No default Content-Type: json= sets it, and the multipart upload
+        # needs its own boundary header
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=30,
+            limits=httpx.Limits(max_connections=20)
+        ) as self.client:
+            # Test basic connectivity
+            success, _ = await self.test_root_endpoint()
+            if not success:
+                print("❌ Root endpoint failed - stopping tests")
+                return self.generate_report()
 
-        # Test core functionality
-        self.test_get_prescriptions()
-        self.test_get_medications()
-        
-        # Test AI-powered endpoints (might be slower)
-        print("\n🤖 Testing AI-powered endpoints (may take longer)...")
+            # The remaining tests are independent, so they run concurrently;
+            # the AI-powered ones may take longer
+            print("\n🤖 Testing core and AI-powered endpoints...")
+            (
+                _, _, (med_success, med_response), (upload_success, upload_response),
+                _, _, (file_success, file_response), _, _
+            ) = await asyncio.gather(
+                self.test_get_prescriptions(),
+                self.test_get_medications(),
+                self.test_add_manual_medication(),
+                self.test_upload_prescription_endpoint(),
+                self.test_contraindication_check(),
+                self.test_add_medications_bulk(),
+                self.test_upload_prescription_file(),
+                self.test_upload_prescription_stream(),
+                self.test_upload_prescription_async()
+            )
+            
+            # The prescription and its image are stored after the upload
+            # responds, so give the batched write a moment before fetching it
+            if file_success:
+                await asyncio.sleep(1)
+                await self.test_get_prescription_image(file_response.get('id'))
         
-        # Add a manual medication first
-        med_success, med_response = self.test_add_manual_medication()
         if med_success:
             print(f"  Medication added with ID: {med_response.get('id', 'unknown')}")
-        
-        # Test prescription upload
-        upload_success, upload_response = self.test_upload_prescription_endpoint()
         if upload_success:
             print(f"  Prescription processed with {len(upload_response.get('medications', []))} medications")
         
-        # Test contraindication check
-        self.test_contraindication_check()
-        
         return self.generate_report()
 
     def generate_report(self):
@@ -220,7 +326,14 @@ class PillGuideAPITester:
             print(f"\n⚠️  CRITICAL: {len(critical_failures)} essential endpoint(s) failing")
             return False
         
-        ai_endpoints = ["Upload Prescription (AI Processing)", "Add Manual Medication (AI Processing)", "Check Contraindications (AI Processing)"]
+        ai_endpoints = [
+            "Upload Prescription (AI Processing)",
+            "Upload Prescription File (AI Processing)",
+            "Upload Prescription Stream (AI Processing)",
+            "Add Manual Medication (AI Processing)",
+            "Add Medications Bulk (AI Processing)",
+            "Check Contraindications (AI Processing)"
+        ]
         ai_failures = [r for r in self.test_results if r['test'] in ai_endpoints and r['status'] == 'FAILED']
         
         if ai_failures:
@@ -233,7 +346,7 @@ def main():
     tester = PillGuideAPITester()
     
     try:
-        success = tester.run_all_tests()
+        success = asyncio.run(tester.run_all_tests())
         return 0 if success else 1
     except KeyboardInterrupt:
         print("\n🛑 Tests interrupted by user")
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { useLocation } from 'react-router-dom';
 import axios from 'axios';
 import { toast } from 'sonner';
 
@@ -6,6 +7,7 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
 const MedicationsPage = () => {
+  const location = useLocation();
   const [medications, setMedications] = useState([]);
   const [prescriptions, setPrescriptions] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -52,7 +54,14 @@ const MedicationsPage = () => {
   const fetchPrescriptions = async () => {
     try {
       const response = await axios.get(`${API}/prescriptions`);
-      setPrescriptions(response.data);
+      // A just-uploaded prescription is written in the background, so keep
+      // the copy handed over by the upload page until the listing has it
+      const uploaded = location.state?.prescription;
+      if (uploaded && !response.data.some((p) => p.id === uploaded.id)) {
+        setPrescriptions([uploaded, ...response.data]);
+      } else {
+        setPrescriptions(response.data);
+      }
     } catch (error) {
       console.error('Error fetching prescriptions:', error);
     }
@@ -5,6 +5,8 @@ import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const MAX_IMAGE_DIMENSION = 1568;
+const JPEG_QUALITY = 0.85;
 
 const UploadPage = () => {
   const navigate = useNavigate();
@@ -41,15 +43,26 @@ const UploadPage = () => {
     }
   };
 
-  const convertToBase64 = (file) => {
-    return new Promise((resolve, reject) => {
-      const reader = new FileReader();
-      reader.readAsDataURL(file);
-      reader.onload = () => {
-        const base64 = reader.result.split(',')[1];
-        resolve(base64);
+  // Re-encode the photo as a JPEG no larger than the backend's analysis size,
+  // so phone photos upload as a fraction of their original bytes
+  const compressImage = (file) => {
+    return new Promise((resolve) => {
+      const img = new Image();
+      const url = URL.createObjectURL(file);
+      img.onload = () => {
+        const scale = Math.min(1, MAX_IMAGE_DIMENSION / Math.max(img.width, img.height));
+        const canvas = document.createElement('canvas');
+        canvas.width = Math.round(img.width * scale);
+        canvas.height = Math.round(img.height * scale);
+        canvas.getContext('2d').drawImage(img, 0, 0, canvas.width, canvas.height);
+        URL.revokeObjectURL(url);
+        canvas.toBlob((blob) => resolve(blob || file), 'image/jpeg', JPEG_QUALITY);
       };
-      reader.onerror = (error) => reject(error);
+      img.onerror = () => {
+        URL.revokeObjectURL(url);
+        resolve(file);
+      };
+      img.src = url;
     });
   };
 
@@ -61,13 +74,14 @@ const UploadPage = () => {
 
     setLoading(true);
     try {
-      const base64Image = await convertToBase64(selectedFile);
-      
-      const response = await axios.post(`${API}/prescriptions/upload`, {
-        image_base64: base64Image,
-        patient_id: 'default-patient',
-        preferred_language: selectedLanguage
-      });
+      const image = await compressImage(selectedFile);
+
+      const formData = new FormData();
+      formData.append('image', image, 'prescription.jpg');
+      formData.append('patient_id', 'default-patient');
+      formData.append('preferred_language', selectedLanguage);
+
+      const response = await axios.post(`${API}/prescriptions/upload/file`, formData);
 
       setResult(response.data);
       toast.success('Prescription analyzed successfully! 🎉');
@@ -273,7 +287,7 @@ const UploadPage = () => {
 
             <div className="flex justify-center pt-6">
               <button
-                onClick={() => navigate('/medications')}
+                onClick={() => navigate('/medications', { state: { prescription: result } })}
                 className="rounded-full bg-clay text-white px-8 py-4 font-semibold font-jakarta shadow-lg hover:shadow-xl transition-all duration-300 hover:-translate-y-0.5 active:translate-y-0"
                 data-testid="view-all-medications-button"
               >
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# server.py reads its settings at import time; the client only connects on
+# first use, so unit tests never reach this address
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'pillguide_test')
+os.environ.setdefault('GEMINI_API_KEY', 'test-key')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
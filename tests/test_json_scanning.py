@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+def medication_json(name, explanation=""):
+    return '{"name": "%s", "dosage": "1 tablet", "plain_explanation": "%s"}' % (name, explanation)
+
+
+# json_object_end
+
+def test_object_end_of_closed_object():
+    text = 'x {"a": {"b": 1}} y'
+    assert server.json_object_end(text, 2) == len('x {"a": {"b": 1}}')
+
+
+def test_object_end_of_unclosed_object():
+    assert server.json_object_end('{"a": {"b": 1}', 0) is None
+
+
+def test_object_end_ignores_braces_in_strings():
+    text = '{"a": "} { }}"}'
+    assert server.json_object_end(text, 0) == len(text)
+
+
+def test_object_end_ignores_escaped_quotes():
+    text = r'{"a": "say \"}\" twice", "b": "\\"}'
+    assert server.json_object_end(text, 0) == len(text)
+
+
+def test_object_end_waits_for_string_to_close():
+    assert server.json_object_end(r'{"a": "\"}', 0) is None
+
+
+# completed_medications
+
+def test_completed_medications_across_chunks():
+    first = medication_json("Paracetamol")
+    second = medication_json("Ibuprofen")
+    text = '[' + first + ', ' + second[:12]
+
+    medications, position = server.completed_medications(text, 1)
+    assert [m.name for m in medications] == ["Paracetamol"]
+
+    text += second[12:] + ']'
+    medications, position = server.completed_medications(text, position)
+    assert [m.name for m in medications] == ["Ibuprofen"]
+    assert text[position] == ']'
+
+
+def test_completed_medications_keeps_braces_in_strings():
+    text = '[' + medication_json("Amoxicillin", "take {with} water }") + ']'
+    medications, _ = server.completed_medications(text, 1)
+    assert medications[0].plain_explanation == "take {with} water }"
+
+
+def test_completed_medications_raises_on_invalid_object():
+    with pytest.raises(server.ValidationError):
+        server.completed_medications('[{"name": ["not", "a", "string"]}]', 1)
+
+
+# stream_prescription_analysis
+
+def run_stream(monkeypatch, chunks, events):
+    async def fake_stream_content(model, contents):
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        async for event in server.stream_prescription_analysis({}, 'en'):
+            events.append(event)
+
+    monkeypatch.setattr(server, 'stream_content', fake_stream_content)
+    asyncio.run(collect())
+
+
+def test_stream_yields_medications_as_they_close(monkeypatch):
+    reply = (
+        '{"detected_language": "es", "detected_language_name": "Spanish", '
+        '"extracted_text": "Rx", "medications": ['
+        + medication_json("Paracetamol") + ', ' + medication_json("Ibuprofen") + ']}'
+    )
+    cut = reply.index('Ibuprofen')
+    events = []
+    run_stream(monkeypatch, [reply[:cut], reply[cut:]], events)
+
+    assert events[0] == ('language', 'es')
+    assert [m.name for kind, m in events if kind == 'medication'] == ["Paracetamol", "Ibuprofen"]
+    assert events[-1][0] == 'result'
+
+
+def test_stream_stops_scanning_after_invalid_medication(monkeypatch):
+    reply = (
+        '{"detected_language": "en", "detected_language_name": "English", '
+        '"extracted_text": "Rx", "medications": ['
+        '{"name": ["bad"]}, ' + medication_json("Ibuprofen") + ']}'
+    )
+    events = []
+    with pytest.raises(server.ValidationError):
+        run_stream(monkeypatch, [reply], events)
+
+    # The scan gave up at the invalid object, so Ibuprofen was never streamed
+    # and the error surfaces from the final parse instead
+    assert [kind for kind, _ in events] == ['language']
+
+
+# strip_trailing_commas / extract_json_from_response
+
+def test_strip_trailing_commas():
+    assert server.strip_trailing_commas('{"a": [1, 2, ], "b": 3 ,\n}') == '{"a": [1, 2 ], "b": 3 \n}'
+
+
+def test_strip_trailing_commas_leaves_strings_alone():
+    text = r'{"a": "x ,]", "b": "y \", }"}'
+    assert server.strip_trailing_commas(text) == text
+
+
+def test_extract_json_repairs_trailing_commas_outside_strings():
+    assert server.extract_json_from_response('{"a": "x ,]", "b": 1,}') == {"a": "x ,]", "b": 1}